@@ -2,9 +2,43 @@ import json
 import boto3
 import os
 import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote_plus
 import uuid
 
+# orjson is optional: when it is packaged with the function (e.g. in a Lambda
+# layer) it is used for the Bedrock request/response and model output parsing
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+# Clients are created once per execution environment so warm invocations
+# reuse their credentials and HTTPS connection pools
+client_config = Config(
+    retries={'mode': 'adaptive'},
+    max_pool_connections=10,
+    tcp_keepalive=True
+)
+# Nova Lite video understanding only supports the synchronous InvokeModel API
+# (StartAsyncInvoke is limited to async-capable models such as Nova Reel), so
+# give the call enough time to finish instead of timing out after botocore's
+# default 60s and re-running the analysis. A single attempt (5s connect + 240s
+# read) fits inside the 5 minute Lambda timeout; a failed call is retried by
+# redelivering its SQS message rather than by botocore
+bedrock_config = client_config.merge(Config(
+    connect_timeout=5,
+    read_timeout=240,
+    retries={'mode': 'adaptive', 'max_attempts': 1}
+))
+bedrock_runtime = boto3.client('bedrock-runtime', region_name=os.environ.get('REGION'), config=bedrock_config)
+s3_client = boto3.client('s3', config=client_config)
+sns_client = boto3.client('sns', config=client_config)
+
 
 def analyze_video_for_threats(s3, bucket_name, file_key):
     """
@@ -13,8 +47,8 @@ def analyze_video_for_threats(s3, bucket_name, file_key):
     :param bucket_name: Name of the S3 bucket
     :param file_key: Key of the video file in S3
     :return: Analysis result as a string
+    :raises Exception: If the Bedrock call fails, so the message is retried
     """
-    bedrock_runtime = boto3.client('bedrock-runtime', region_name=os.environ.get('REGION'))
     system_list = [
         {
             "text": "You are an expert security analyst. Analyze the provided video for potential security risks."
@@ -55,28 +89,29 @@ Please respond with only a JSON object containing 4 keys:
     try:
         response = bedrock_runtime.invoke_model(
             modelId="amazon.nova-lite-v1:0",
-            body=json.dumps(native_request)
+            body=json_dumps(native_request)
         )
-        model_response = json.loads(response["body"].read())
+        model_response = json_loads(response["body"].read())
         analysis = model_response["output"]["message"]["content"][0]["text"]
         return analysis
     except Exception as e:
+        # Propagate so the video is reported as a batch item failure and redelivered
         print(f"Error in analyze_video_for_threats: {str(e)}")
-        return None
+        raise
 
 def send_sns_email(subject, message):
     """
     Send an SNS email notification.
     :param subject: Email subject
     :param message: Email body
+    :raises Exception: If publishing fails, so the alert is retried rather than lost
     """
-    sns = boto3.client('sns')
     topic_arn = os.environ.get('SNS_TOPIC_ARN')
     if not topic_arn:
         print("SNS_TOPIC_ARN not set in environment variables")
         return
     try:
-        response = sns.publish(
+        response = sns_client.publish(
             TopicArn=topic_arn,
             Message=message,
             Subject=subject
@@ -84,17 +119,15 @@ def send_sns_email(subject, message):
         print(f"SNS email sent. Message ID: {response['MessageId']}")
     except Exception as e:
         print(f"Error sending SNS email: {str(e)}")
-def lambda_handler(event, context):
+        raise
+
+def process_video(bucket_name, file_key):
     """
-    Main Lambda function handler. Processes new videos uploaded to the S3 bucket.
-    :param event: AWS Lambda uses this parameter to pass in event data to the handler.
-    :param context: AWS Lambda uses this parameter to provide runtime information to your handler.
-    :return: Lambda function result
+    Analyze a single uploaded video and send an alert if it is high risk.
+    :param bucket_name: Name of the S3 bucket
+    :param file_key: Key of the video file in S3
+    :return: Processing result for the video
     """
-    s3 = boto3.client('s3')
-    bucket_name = event['Records'][0]['s3']['bucket']['name']
-    file_key = unquote_plus(event['Records'][0]['s3']['object']['key'])
-
     if not file_key.lower().endswith('.mp4'):
         print(f"File is not an MP4 video: {file_key}")
         return {
@@ -103,7 +136,7 @@ def lambda_handler(event, context):
         }
     try:
         # Analyze the video for threats
-        result = analyze_video_for_threats(s3, bucket_name, file_key)
+        result = analyze_video_for_threats(s3_client, bucket_name, file_key)
         if not result:
             print(f"No analysis result for video: {file_key}")
             return {
@@ -112,18 +145,31 @@ def lambda_handler(event, context):
             }
         print(f"Analysis completed for video: {file_key}")
         print(f"Result: {result}")
-        # Parse the result JSON
-        result_json = json.loads(result)
-        # Check if the risk level is 5 or higher
-        if result_json['risk'] >= 6:
+        # Parse the result JSON. Malformed model output will not improve on a retry,
+        # so log it and treat the video as done rather than paying for it again
+        try:
+            result_json = json_loads(result)
+            risk = result_json['risk']
+            risk_subject = result_json['subject']
+            risk_body = result_json['body']
+            full_analysis = result_json['full_analysis']
+            # Check if the risk level is 6 or higher
+            high_risk = risk >= 6
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"Unparseable analysis result for video {file_key}: {str(e)}")
+            return {
+                'statusCode': 200,
+                'body': json.dumps('Unparseable analysis result')
+            }
+        if high_risk:
             # Send email notification
-            subject = f"High Risk Alert: {result_json['subject']}"
+            subject = f"High Risk Alert: {risk_subject}"
             message = f"""
 
-            Risk Level: {result_json['risk']}/10
-            {result_json['body']}
+            Risk Level: {risk}/10
+            {risk_body}
             Full Analysis:
-            {result_json['full_analysis']}
+            {full_analysis}
             Video: {file_key}
             """
             send_sns_email(subject, message)
@@ -139,3 +185,42 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps(f"Error processing video: {str(e)}")
         }
+
+def process_message(record):
+    """
+    Process one SQS message carrying an S3 event notification.
+    :param record: SQS record from the Lambda event
+    :return: True if every video in the notification was processed
+    """
+    notification = json_loads(record['body'])
+    # S3 sends an s3:TestEvent without Records when the notification is configured
+    results = [
+        process_video(
+            s3_record['s3']['bucket']['name'],
+            unquote_plus(s3_record['s3']['object']['key'])
+        )
+        for s3_record in notification.get('Records', [])
+    ]
+    return all(result['statusCode'] != 500 for result in results)
+
+def lambda_handler(event, context):
+    """
+    Main Lambda function handler. Processes a batch of S3 upload notifications
+    delivered through SQS, analyzing the videos in the batch concurrently.
+    :param event: AWS Lambda uses this parameter to pass in event data to the handler.
+    :param context: AWS Lambda uses this parameter to provide runtime information to your handler.
+    :return: Partial batch response listing the messages to retry
+    """
+    records = event['Records']
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(len(records), 1)) as executor:
+        futures = {record['messageId']: executor.submit(process_message, record) for record in records}
+        for message_id, future in futures.items():
+            try:
+                succeeded = future.result()
+            except Exception as e:
+                print(f"Error processing message {message_id}: {str(e)}")
+                succeeded = False
+            if not succeeded:
+                failures.append({'itemIdentifier': message_id})
+    return {'batchItemFailures': failures}
@@ -0,0 +1,94 @@
+import importlib.util
+import io
+import json
+import os
+
+from botocore.exceptions import ClientError
+
+LAMBDA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "lambda", "lambda_function.py")
+
+
+def load_lambda_function(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("REGION", "us-east-1")
+    spec = importlib.util.spec_from_file_location("lambda_function", LAMBDA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ThrottledBedrock:
+    def invoke_model(self, **kwargs):
+        raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "InvokeModel")
+
+
+def test_partial_batch_response_reports_failed_video(monkeypatch):
+    lambda_function = load_lambda_function(monkeypatch)
+    monkeypatch.setattr(lambda_function, "bedrock_runtime", ThrottledBedrock())
+
+    video_notification = {
+        "Records": [{
+            "s3": {
+                "bucket": {"name": "video-bucket"},
+                "object": {"key": "motion_videos/clip.mp4"}
+            }
+        }]
+    }
+    test_event = {"Service": "Amazon S3", "Event": "s3:TestEvent", "Bucket": "video-bucket"}
+    event = {
+        "Records": [
+            {"messageId": "video-message", "body": json.dumps(video_notification)},
+            {"messageId": "test-event-message", "body": json.dumps(test_event)}
+        ]
+    }
+
+    response = lambda_function.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "video-message"}]}
+
+
+class AnalyzedBedrock:
+    def __init__(self, text):
+        self.text = text
+
+    def invoke_model(self, **kwargs):
+        body = json.dumps({"output": {"message": {"content": [{"text": self.text}]}}})
+        return {"body": io.BytesIO(body.encode())}
+
+
+class FailingSNS:
+    def publish(self, **kwargs):
+        raise ClientError({"Error": {"Code": "InternalError", "Message": "Publish failed"}}, "Publish")
+
+
+def video_event():
+    notification = {
+        "Records": [{
+            "s3": {
+                "bucket": {"name": "video-bucket"},
+                "object": {"key": "motion_videos/clip.mp4"}
+            }
+        }]
+    }
+    return {"Records": [{"messageId": "video-message", "body": json.dumps(notification)}]}
+
+
+def test_unparseable_analysis_is_not_retried(monkeypatch):
+    lambda_function = load_lambda_function(monkeypatch)
+    monkeypatch.setattr(lambda_function, "bedrock_runtime", AnalyzedBedrock("```json\n{\"risk\": 8}\n```"))
+
+    response = lambda_function.lambda_handler(video_event(), None)
+
+    assert response == {"batchItemFailures": []}
+
+
+def test_failed_alert_is_retried(monkeypatch):
+    lambda_function = load_lambda_function(monkeypatch)
+    analysis = {"risk": 8, "subject": "Trespassing", "body": "Hello team", "full_analysis": "Person climbing fence"}
+    monkeypatch.setattr(lambda_function, "bedrock_runtime", AnalyzedBedrock(json.dumps(analysis)))
+    monkeypatch.setattr(lambda_function, "sns_client", FailingSNS())
+    monkeypatch.setenv("SNS_TOPIC_ARN", "arn:aws:sns:us-east-1:123456789012:alerts")
+
+    response = lambda_function.lambda_handler(video_event(), None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "video-message"}]}
@@ -3,13 +3,79 @@ import aws_cdk.assertions as assertions
 
 from video_monitoring.video_monitoring_stack import VideoMonitoringStack
 
-# example tests. To run these tests, uncomment this file along with the example
-# resource in video_monitoring/video_monitoring_stack.py
 def test_sqs_queue_created():
     app = core.App()
     stack = VideoMonitoringStack(app, "video-monitoring")
     template = assertions.Template.from_stack(stack)
 
-#     template.has_resource_properties("AWS::SQS::Queue", {
-#         "VisibilityTimeout": 300
-#     })
+    template.has_resource_properties("AWS::SQS::Queue", {
+        "VisibilityTimeout": 1800,
+        "RedrivePolicy": {
+            "maxReceiveCount": 3
+        }
+    })
+
+    template.has_resource_properties("AWS::Lambda::EventSourceMapping", {
+        "BatchSize": 5,
+        "MaximumBatchingWindowInSeconds": 30,
+        "FunctionResponseTypes": ["ReportBatchItemFailures"]
+    })
+
+def test_video_bucket_lifecycle():
+    app = core.App()
+    stack = VideoMonitoringStack(app, "video-monitoring")
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::S3::Bucket", {
+        "VersioningConfiguration": assertions.Match.absent(),
+        "LifecycleConfiguration": {
+            "Rules": [{
+                "ExpirationInDays": 7,
+                "AbortIncompleteMultipartUpload": {
+                    "DaysAfterInitiation": 1
+                },
+                "Status": "Enabled"
+            }]
+        }
+    })
+
+def test_lambda_role_inline_policy():
+    app = core.App()
+    stack = VideoMonitoringStack(app, "video-monitoring")
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::IAM::Role", {
+        "AssumeRolePolicyDocument": assertions.Match.object_like({
+            "Statement": [assertions.Match.object_like({
+                "Principal": {"Service": "lambda.amazonaws.com"}
+            })]
+        }),
+        "Policies": [assertions.Match.object_like({
+            "PolicyName": "LambdaPolicy"
+        })]
+    })
+
+def test_vpc_has_no_nat_gateway():
+    app = core.App()
+    stack = VideoMonitoringStack(app, "video-monitoring")
+    template = assertions.Template.from_stack(stack)
+
+    template.resource_count_is("AWS::EC2::NatGateway", 0)
+    template.resource_count_is("AWS::EC2::VPCEndpoint", 6)
+
+def test_lambda_alias_provisioned_concurrency():
+    app = core.App()
+    stack = VideoMonitoringStack(app, "video-monitoring")
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Architectures": ["arm64"],
+        "MemorySize": 1024
+    })
+
+    template.has_resource_properties("AWS::Lambda::Alias", {
+        "Name": "live",
+        "ProvisionedConcurrencyConfig": {
+            "ProvisionedConcurrentExecutions": 1
+        }
+    })
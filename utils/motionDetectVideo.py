@@ -1,13 +1,65 @@
 import boto3
 import cv2
 import os
+import queue
+import threading
 import time
 import numpy as np
+from boto3.s3.transfer import TransferConfig
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Tuple, List
+from typing import Deque, Optional, Tuple
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from io import BytesIO
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; OpenCV's absdiff + threshold are used instead
+    njit = None
+
+if njit is not None:
+    @njit(cache=True)
+    def diff_threshold(prev: np.ndarray, cur: np.ndarray, thresh_val: int, out: np.ndarray) -> None:
+        """Fused absdiff + binary threshold over two grayscale frames in a single pass"""
+        for i in range(prev.shape[0]):
+            for j in range(prev.shape[1]):
+                d = abs(int(cur[i, j]) - int(prev[i, j]))
+                out[i, j] = 255 if d > thresh_val else 0
+else:
+    diff_threshold = None
+
+class CudaVideoCapture:
+    """cv2.VideoCapture-compatible reader that decodes on the GPU with NVDEC"""
+    def __init__(self, url: str):
+        self.reader = None
+        try:
+            self.reader = cv2.cudacodec.createVideoReader(url)
+        except Exception as e:
+            print(f"Failed to open stream with NVDEC: {str(e)}")
+
+    def isOpened(self) -> bool:
+        return self.reader is not None
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            try:
+                return float(self.reader.format().fps)
+            except Exception:
+                return 0.0
+        return 0.0
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Decode the next frame and download it as BGR, the layout the rest of the pipeline expects"""
+        ret, gpu_frame = self.reader.nextFrame()
+        if not ret:
+            return False, None
+        return True, cv2.cuda.cvtColor(gpu_frame, cv2.COLOR_BGRA2BGR).download()
+
+    def release(self) -> None:
+        self.reader = None
+
 class KinesisVideoProcessor:
     def __init__(self):
         # Constants
@@ -15,12 +67,31 @@ class KinesisVideoProcessor:
         self.MAX_FRAMES = 2700  # 90 seconds at 30fps
         self.RETRY_DELAY = 2
         self.PRE_BUFFER_SIZE = 90  # 3 seconds of pre-motion frames at 30fps
-        self.MOTION_BUFFER_SIZE = 30  # Number of frames to analyze for motion
+        self.MOTION_FRAME_SIZE = (320, 240)  # Resolution used for motion analysis
+        self.MOTION_BLUR_KERNEL = (5, 5)  # Smoothing kernel applied at MOTION_FRAME_SIZE
+        self.DIFF_THRESHOLD = 25  # Per-pixel intensity change counted as motion
+        self.BG_UPDATE_INTERVAL = 5  # Update the background model on every Nth detection
+        self.BG_LEARNING_RATE = 0.05  # Weight of the current frame in the running-average background
         self.MAX_RETRIES = 3
         self.LOOKBACK_SECONDS = 10
-        self.MOTION_THRESHOLD = 0.5
-        self.NO_MOTION_THRESHOLD = 30
+        self.WINDOW_SECONDS = 90  # Longest stretch of archive requested per HLS session
+        self.MIN_WINDOW_SECONDS = 5  # New footage needed before another session is requested
+        self.MOTION_BLOCK_SIZE = 20  # Side of the square blocks motion is scored over
+        self.MOTION_BLOCK_THRESHOLD = 0.1  # Fraction of changed pixels for a block to register motion
+        self.NO_MOTION_THRESHOLD = 30  # Frames without motion before a recording is stopped
+        self.MOTION_DETECT_INTERVAL = 3  # Run motion detection on every Nth frame
         self.INACTIVE_STREAM_TIMEOUT = 5  # Seconds to wait before considering stream inactive
+        self.MAX_READ_FAILURES = 3  # Consecutive failed reads that mark the end of an archived window
+        self.READ_RETRY_DELAY = 0.1  # Seconds between retries of a failed read
+        self.FRAME_QUEUE_SIZE = 60  # Decoded frames buffered between the reader thread and processing
+        self.UPLOAD_WORKERS = 2  # Recordings uploaded to S3 concurrently with stream processing
+        self.USE_OPENCL = cv2.ocl.haveOpenCL()  # Run the motion pipeline through OpenCV's T-API when available
+        # Fuse the diff and threshold passes with Numba on CPU-only hosts
+        self.USE_NUMBA = diff_threshold is not None and not self.USE_OPENCL
+        # Decode the stream with NVDEC when OpenCV is built with CUDA and a GPU is present
+        self.USE_CUDA_DECODE = hasattr(cv2, 'cudacodec') and cv2.cuda.getCudaEnabledDeviceCount() > 0
+        # GStreamer hardware H.264 encoders, tried in order (Jetson, Intel/AMD VA-API, V4L2 M2M)
+        self.HW_ENCODERS = ['nvv4l2h264enc', 'vaapih264enc', 'v4l2h264enc']
         
         # Initialize state
         self.stream_name = os.environ.get('KVS_STREAM_NAME')
@@ -29,10 +100,49 @@ class KinesisVideoProcessor:
         if not all([self.stream_name, self.s3_bucket]):
             raise ValueError("Required environment variables KVS_STREAM_NAME and S3_BUCKET_NAME must be set")
             
-        # Initialize AWS clients
+        # Blocks to leave out of motion scoring (e.g. trees or sky), given as "row,col;row,col"
+        self.motion_ignore_blocks = self.parse_ignore_blocks(os.environ.get('MOTION_IGNORE_BLOCKS', ''))
+            
+        # Upload recordings with parallel multipart transfers on a background pool
+        self.s3_transfer_config = TransferConfig(
+            multipart_threshold=8 * 1024 * 1024,
+            multipart_chunksize=8 * 1024 * 1024,
+            max_concurrency=8,
+            use_threads=True
+        )
+
+        # Initialize AWS clients; the S3 connection pool covers every part upload
+        # that can run at once so connections are reused rather than discarded
         self.kvs_client = boto3.client("kinesisvideo")
-        self.s3_client = boto3.client('s3')
+        self.s3_client = boto3.client('s3', config=Config(
+            max_pool_connections=self.UPLOAD_WORKERS * self.s3_transfer_config.max_concurrency
+        ))
+        self.upload_executor = ThreadPoolExecutor(max_workers=self.UPLOAD_WORKERS)
+        # Kept across sessions so temp files of recordings still uploading are never reused
+        self.video_count = 0
         
+        # Enable OpenCL so UMat operations are offloaded to the device
+        cv2.ocl.setUseOpenCL(self.USE_OPENCL)
+        print(f"OpenCL motion pipeline: {'enabled' if self.USE_OPENCL else 'disabled'}")
+
+        # Working buffers for the motion pipeline, reused on every frame
+        self.small_buf = self.new_motion_buffer(channels=3)
+        self.gray_buf = self.new_motion_buffer()
+        self.blur_buf = self.new_motion_buffer()
+        self.background = self.new_motion_buffer(dtype=np.float32)  # running-average background
+        self.background_u8 = self.new_motion_buffer()
+        self.delta_buf = self.new_motion_buffer()
+        self.thresh_buf = self.new_motion_buffer()
+        self.dilate_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        self.dilate_out = self.new_motion_buffer()
+
+        # Archive windows are walked end to end; None until the first window is processed
+        self.next_start_timestamp = None
+
+        # The background model is kept across recording sessions
+        self.has_background = False
+        self.detection_count = 0
+
         # Reset initial state
         self.reset_state()
 
@@ -40,21 +150,53 @@ class KinesisVideoProcessor:
         """Reset all state variables for a new recording session"""
         self.video_writer = None
         self.frames_written = 0
-        self.pre_motion_buffer: List[Tuple[np.ndarray, datetime]] = []  # (frame, timestamp)
-        self.motion_analysis_buffer: List[np.ndarray] = []
+        self.pre_motion_buffer: Deque[Tuple[np.ndarray, datetime]] = deque(maxlen=self.PRE_BUFFER_SIZE)  # (I420 frame, timestamp)
         self.current_output_path = None
-        self.video_count = 0
         self.motion_detected = False
         self.no_motion_count = 0
         self.input_fps = 30.0
-        self.prev_frame = None
         self.last_frame_time = None
+        self.frame_counter = 0
+
+    def new_motion_buffer(self, channels: int = 1, dtype=np.uint8):
+        """
+        Allocate a zero-filled uint8 or float32 buffer at MOTION_FRAME_SIZE for the motion pipeline.
+        Buffers are zeroed so accumulating into them never picks up uninitialized memory (e.g. NaN).
+        """
+        width, height = self.MOTION_FRAME_SIZE
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        buffer = np.zeros(shape, dtype=dtype)
+        return cv2.UMat(buffer) if self.USE_OPENCL else buffer
+
+    def parse_ignore_blocks(self, spec: str) -> np.ndarray:
+        """Build the boolean block mask of regions excluded from motion scoring"""
+        cols, rows = (size // self.MOTION_BLOCK_SIZE for size in self.MOTION_FRAME_SIZE)
+        mask = np.zeros((rows, cols), dtype=bool)
+        for entry in filter(None, (e.strip() for e in spec.split(';'))):
+            try:
+                row, col = (int(v) for v in entry.split(','))
+            except ValueError:
+                raise ValueError(f"MOTION_IGNORE_BLOCKS entry '{entry}' must be 'row,col'") from None
+            if not (0 <= row < rows and 0 <= col < cols):
+                raise ValueError(
+                    f"MOTION_IGNORE_BLOCKS entry '{entry}' is outside the {rows}x{cols} block grid "
+                    f"(rows 0-{rows - 1}, columns 0-{cols - 1})"
+                )
+            mask[row, col] = True
+        return mask
 
     def get_stream_endpoint(self) -> Tuple[Optional[str], Optional[datetime], Optional[datetime]]:
-        """Get Kinesis Video Stream endpoint for archived media"""
+        """
+        Get Kinesis Video Stream endpoint for the next unprocessed window of archived media.
+        Returns (None, None, None) when there is no new footage yet or the request fails.
+        """
         try:
-            end_timestamp = datetime.utcnow() - timedelta(seconds=self.LOOKBACK_SECONDS)
-            start_timestamp = end_timestamp - timedelta(seconds=90)
+            # Continue from where the previous window ended so no footage is processed twice
+            latest_timestamp = datetime.utcnow() - timedelta(seconds=self.LOOKBACK_SECONDS)
+            start_timestamp = self.next_start_timestamp or latest_timestamp - timedelta(seconds=self.WINDOW_SECONDS)
+            end_timestamp = min(latest_timestamp, start_timestamp + timedelta(seconds=self.WINDOW_SECONDS))
+            if end_timestamp - start_timestamp < timedelta(seconds=self.MIN_WINDOW_SECONDS):
+                return None, None, None
 
             endpoint = self.kvs_client.get_data_endpoint(
                 APIName="GET_HLS_STREAMING_SESSION_URL",
@@ -64,19 +206,27 @@ class KinesisVideoProcessor:
             kvam = boto3.client("kinesis-video-archived-media", 
                               endpoint_url=endpoint)
             
-            url = kvam.get_hls_streaming_session_url(
-                StreamName=self.stream_name,
-                PlaybackMode="ON_DEMAND",
-                ContainerFormat='FRAGMENTED_MP4',
-                DiscontinuityMode='ON_DISCONTINUITY',
-                HLSFragmentSelector={
-                    'FragmentSelectorType': 'SERVER_TIMESTAMP',
-                    'TimestampRange': {
-                        'StartTimestamp': start_timestamp,
-                        'EndTimestamp': end_timestamp
+            try:
+                url = kvam.get_hls_streaming_session_url(
+                    StreamName=self.stream_name,
+                    PlaybackMode="ON_DEMAND",
+                    ContainerFormat='FRAGMENTED_MP4',
+                    DiscontinuityMode='ON_DISCONTINUITY',
+                    HLSFragmentSelector={
+                        'FragmentSelectorType': 'SERVER_TIMESTAMP',
+                        'TimestampRange': {
+                            'StartTimestamp': start_timestamp,
+                            'EndTimestamp': end_timestamp
+                        }
                     }
-                }
-            )['HLSStreamingSessionURL']
+                )['HLSStreamingSessionURL']
+            except kvam.exceptions.ResourceNotFoundException:
+                # No fragments were ingested in this window: the camera stopped sending,
+                # so end any recording carried over from earlier windows and move past it
+                print(f"No footage between {start_timestamp} and {end_timestamp}")
+                self.finish_recording("stream inactive")
+                self.next_start_timestamp = end_timestamp
+                return None, None, None
             
             return url, start_timestamp, end_timestamp
                 
@@ -93,35 +243,50 @@ class KinesisVideoProcessor:
 
     def detect_motion(self, frame: np.ndarray) -> bool:
         """
-        Detect motion using frame differencing with buffered analysis
+        Detect motion against a running-average background on a downsampled copy of the frame
         """
         try:
-            # Add frame to motion analysis buffer
-            self.motion_analysis_buffer.append(frame)
-            
-            # Keep only the required number of frames for analysis
-            if len(self.motion_analysis_buffer) > self.MOTION_BUFFER_SIZE:
-                self.motion_analysis_buffer.pop(0)
-                
-            # Need minimum number of frames for analysis
-            if len(self.motion_analysis_buffer) < 2:
-                return False
-                
+            # Upload to a UMat so the whole chain stays on the OpenCL device
+            src = cv2.UMat(frame) if self.USE_OPENCL else frame
+
+            # Motion detection does not need full resolution; work on a small copy
+            cv2.resize(src, self.MOTION_FRAME_SIZE, dst=self.small_buf, interpolation=cv2.INTER_AREA)
+
             # Process the latest frame
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            gray = cv2.GaussianBlur(gray, (21, 21), 0)
+            gray = self.blur_buf
+            cv2.cvtColor(self.small_buf, cv2.COLOR_BGR2GRAY, dst=self.gray_buf)
+            cv2.GaussianBlur(self.gray_buf, self.MOTION_BLUR_KERNEL, 0, dst=gray)
 
-            if self.prev_frame is None:
-                self.prev_frame = gray
+            if not self.has_background:
+                # Seed the background with the first frame (alpha=1 gives 0 * zeroed buffer + frame)
+                cv2.accumulateWeighted(gray, self.background, 1.0)
+                cv2.convertScaleAbs(self.background, dst=self.background_u8)
+                self.has_background = True
                 return False
 
-            # Compute frame difference
-            frame_delta = cv2.absdiff(self.prev_frame, gray)
-            thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)[1]
-            thresh = cv2.dilate(thresh, None, iterations=2)
+            # Compute difference from the background
+            if self.USE_NUMBA:
+                diff_threshold(self.background_u8, gray, self.DIFF_THRESHOLD, self.thresh_buf)
+            else:
+                cv2.absdiff(self.background_u8, gray, dst=self.delta_buf)
+                cv2.threshold(self.delta_buf, self.DIFF_THRESHOLD, 255, cv2.THRESH_BINARY, dst=self.thresh_buf)
+            thresh = cv2.dilate(self.thresh_buf, self.dilate_kernel, dst=self.dilate_out, iterations=2)
+
+            # The background changes slowly, so it only needs updating every few detections
+            self.detection_count += 1
+            if self.detection_count % self.BG_UPDATE_INTERVAL == 0:
+                cv2.accumulateWeighted(gray, self.background, self.BG_LEARNING_RATE)
+                cv2.convertScaleAbs(self.background, dst=self.background_u8)
 
-            self.prev_frame = gray
-            motion_detected = np.mean(thresh) > self.MOTION_THRESHOLD
+            # Score each MOTION_BLOCK_SIZE block with O(1) integral image lookups so
+            # localized motion is detected and ignored blocks can be masked out
+            mask = thresh.get() if isinstance(thresh, cv2.UMat) else thresh
+            integ = cv2.integral(mask)
+            k = self.MOTION_BLOCK_SIZE
+            block_sums = integ[k::k, k::k] - integ[:-k:k, k::k] - integ[k::k, :-k:k] + integ[:-k:k, :-k:k]
+            block_scores = block_sums / (255.0 * k * k)
+            block_scores[self.motion_ignore_blocks] = 0
+            motion_detected = bool((block_scores > self.MOTION_BLOCK_THRESHOLD).any())
             
             if motion_detected:
                 self.no_motion_count = 0
@@ -144,10 +309,39 @@ class KinesisVideoProcessor:
             self.video_count += 1
             timestamp_str = current_timestamp.strftime("%Y%m%d_%H%M%S")
             
+            # Buffered frames are planar I420: the chroma planes add height / 2 rows
             initial_frame = self.pre_motion_buffer[0][0]
-            height, width = initial_frame.shape[:2]
+            height, width = initial_frame.shape[0] * 2 // 3, initial_frame.shape[1]
             
-            # Try different codec options
+            base_path = f"/tmp/motion_{timestamp_str}_{self.video_count}"
+
+            # Prefer a hardware-accelerated H.264 encoder through GStreamer
+            for encoder in self.HW_ENCODERS:
+                try:
+                    output_path = f"{base_path}.mp4"
+                    pipeline = (
+                        f"appsrc ! videoconvert ! {encoder} ! h264parse ! "
+                        f"mp4mux ! filesink location={output_path}"
+                    )
+
+                    writer = cv2.VideoWriter(
+                        pipeline,
+                        cv2.CAP_GSTREAMER,
+                        0,
+                        self.input_fps,
+                        (width, height)
+                    )
+
+                    if writer is not None and writer.isOpened():
+                        self.video_writer = writer
+                        self.current_output_path = output_path
+                        print(f"Successfully initialized hardware encoder {encoder}")
+                        break
+                except Exception as e:
+                    print(f"Failed to initialize hardware encoder {encoder}: {str(e)}")
+                    continue
+
+            # Fall back to software codec options
             codec_options = [
                 ('mp4v', '.mp4'),
                 ('XVID', '.avi'),
@@ -156,8 +350,10 @@ class KinesisVideoProcessor:
             ]
             
             for codec, ext in codec_options:
+                if self.video_writer is not None:
+                    break
                 try:
-                    output_path = f"/tmp/motion_{timestamp_str}_{self.video_count}{ext}"
+                    output_path = f"{base_path}{ext}"
                     fourcc = cv2.VideoWriter_fourcc(*codec)
                     
                     writer = cv2.VideoWriter(
@@ -181,7 +377,7 @@ class KinesisVideoProcessor:
                 
             # Write pre-motion buffer frames
             for frame, _ in self.pre_motion_buffer:
-                self.video_writer.write(frame)
+                self.video_writer.write(cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420))
                 self.frames_written += 1
                 
             self.pre_motion_buffer.clear()
@@ -200,17 +396,20 @@ class KinesisVideoProcessor:
             # Update last frame time
             self.last_frame_time = time.time()
             
-            # Store frame in pre-motion buffer
-            self.pre_motion_buffer.append((frame.copy(), current_timestamp))
-            
-            # Maintain pre-motion buffer size
-            while len(self.pre_motion_buffer) > self.PRE_BUFFER_SIZE:
-                self.pre_motion_buffer.pop(0)
+            # Store frame in pre-motion buffer (oldest frame is evicted automatically).
+            # Frames are kept as I420, which needs half the memory of BGR. The buffer is
+            # only drained when recording starts, so skip it while already recording.
+            if self.video_writer is None:
+                self.pre_motion_buffer.append((cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420), current_timestamp))
 
-            motion_detected = self.detect_motion(frame)
+            # Only run detection every MOTION_DETECT_INTERVAL frames and reuse the
+            # previous result in between
+            self.frame_counter += 1
+            if self.frame_counter % self.MOTION_DETECT_INTERVAL == 0:
+                self.motion_detected = self.detect_motion(frame)
+            motion_detected = self.motion_detected
             
             if not self.video_writer and motion_detected:
-                self.motion_detected = True
                 self.start_recording(current_timestamp)
             elif self.video_writer:
                 self.video_writer.write(frame)
@@ -220,7 +419,7 @@ class KinesisVideoProcessor:
                 if self.frames_written >= self.MAX_FRAMES:
                     self.finish_recording("maximum frames reached")
                 elif (self.frames_written >= self.MIN_FRAMES and 
-                      self.no_motion_count > self.NO_MOTION_THRESHOLD):
+                      self.no_motion_count > self.NO_MOTION_THRESHOLD / self.MOTION_DETECT_INTERVAL):
                     self.finish_recording("no motion detected")
                     
         except Exception as e:
@@ -229,7 +428,7 @@ class KinesisVideoProcessor:
                 self.finish_recording("error during processing")
 
     def finish_recording(self, reason: str) -> None:
-        """Finish recording and upload to S3"""
+        """Finish recording and hand the video off for upload to S3"""
         if not self.video_writer:
             return
             
@@ -243,14 +442,27 @@ class KinesisVideoProcessor:
                      f"frames{self.frames_written}_"
                      f"duration{duration:.1f}s.mp4")
             
-            if os.path.exists(self.current_output_path) and os.path.getsize(self.current_output_path) > 0:
+            print(f"Recording finished ({reason}): frames={self.frames_written}, duration={duration:.1f}s")
+            # Upload in the background so stream processing can continue immediately
+            self.upload_executor.submit(self.upload_video, self.current_output_path, s3_key)
+                
+        except Exception as e:
+            print(f"Failed to finish recording: {str(e)}")
+            
+        finally:
+            self.reset_state()
+
+    def upload_video(self, output_path: str, s3_key: str) -> None:
+        """Upload a finished video to S3 and remove the temporary file"""
+        try:
+            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
                 self.s3_client.upload_file(
-                    self.current_output_path,
+                    output_path,
                     self.s3_bucket,
-                    s3_key
+                    s3_key,
+                    Config=self.s3_transfer_config
                 )
                 print(f"Uploaded video to S3: {s3_key}")
-                print(f"Recording finished ({reason}): frames={self.frames_written}, duration={duration:.1f}s")
             else:
                 print("Skipping upload: Empty or missing video file")
                 
@@ -258,12 +470,53 @@ class KinesisVideoProcessor:
             print(f"Failed to upload to S3: {str(e)}")
             
         finally:
-            if os.path.exists(self.current_output_path):
+            if os.path.exists(output_path):
                 try:
-                    os.remove(self.current_output_path)
+                    os.remove(output_path)
                 except Exception as e:
                     print(f"Failed to remove temporary file: {str(e)}")
-            self.reset_state()
+
+    def read_frames(self, cap, frame_queue: queue.Queue, stop_event: threading.Event) -> None:
+        """
+        Read frames into the queue until the stream goes inactive, then enqueue None.
+        The reader owns the capture and releases it itself, so it is never released
+        while a read is still in progress on this thread.
+        """
+        last_frame_time = time.time()
+        failed_reads = 0
+        try:
+            while not stop_event.is_set():
+                ret, frame = cap.read()
+                
+                if not ret:
+                    # An ON_DEMAND HLS session is finite, so repeated failed reads
+                    # mean the window has been read to the end
+                    failed_reads += 1
+                    if (failed_reads >= self.MAX_READ_FAILURES or
+                            time.time() - last_frame_time > self.INACTIVE_STREAM_TIMEOUT):
+                        break
+                    time.sleep(self.READ_RETRY_DELAY)
+                    continue
+                
+                failed_reads = 0
+                last_frame_time = time.time()
+                self.put_frame(frame_queue, frame, stop_event)
+        except Exception as e:
+            print(f"Error reading stream: {str(e)}")
+        finally:
+            try:
+                self.put_frame(frame_queue, None, stop_event)
+            finally:
+                cap.release()
+
+    def put_frame(self, frame_queue: queue.Queue, frame: Optional[np.ndarray], stop_event: threading.Event) -> None:
+        """Block until the frame is queued or the consumer has stopped"""
+        while not stop_event.is_set():
+            try:
+                frame_queue.put(frame, timeout=0.5)
+                return
+            except queue.Full:
+                continue
 
     def process_archived_stream(self) -> None:
         """Process archived video from the stream"""
@@ -273,8 +526,12 @@ class KinesisVideoProcessor:
             if stream_url:
                 print(f"Processing archived stream from {start_time} to {end_time}")
                 cap = None
+                reader = None
                 try:
-                    cap = cv2.VideoCapture(stream_url)
+                    if self.USE_CUDA_DECODE:
+                        cap = CudaVideoCapture(stream_url)
+                    if cap is None or not cap.isOpened():
+                        cap = cv2.VideoCapture(stream_url)
                     if not cap.isOpened():
                         print("Failed to open stream URL")
                         time.sleep(self.RETRY_DELAY)
@@ -285,23 +542,27 @@ class KinesisVideoProcessor:
                         self.input_fps = detected_fps
                     print(f"Input stream FPS: {self.input_fps}")
 
+                    # Decode on a reader thread so capture overlaps with processing and
+                    # the archive is drained as fast as frames can be processed
+                    frame_queue = queue.Queue(maxsize=self.FRAME_QUEUE_SIZE)
+                    stop_event = threading.Event()
+                    reader = threading.Thread(
+                        target=self.read_frames,
+                        args=(cap, frame_queue, stop_event),
+                        daemon=True
+                    )
+                    reader.start()
+
                     frame_count = 0
-                    last_frame_time = time.time()
-                    frame_interval = 1.0 / self.input_fps
                     
                     while True:
-                        ret, frame = cap.read()
+                        frame = frame_queue.get()
                         
-                        if not ret:
-                            # Check if stream is inactive
-                            if time.time() - last_frame_time > self.INACTIVE_STREAM_TIMEOUT:
-                                print("Stream appears to be inactive")
-                                if self.video_writer:
-                                    self.finish_recording("stream inactive")
-                                break
-                            continue
+                        if frame is None:
+                            # Windows are contiguous, so an open recording continues into the next one
+                            print("Reached the end of the archived window")
+                            break
                         
-                        last_frame_time = time.time()
                         frame_count += 1
                         
                         current_timestamp = start_time + timedelta(
@@ -309,9 +570,6 @@ class KinesisVideoProcessor:
                         )
                         
                         self.process_frame(frame, current_timestamp)
-                        
-                        # Maintain proper frame timing
-                        time.sleep(max(0, frame_interval - (time.time() - last_frame_time)))
                     
                 except Exception as e:
                     print(f"Error processing stream: {str(e)}")
@@ -319,15 +577,23 @@ class KinesisVideoProcessor:
                         self.finish_recording("error occurred")
                 
                 finally:
-                    if self.video_writer:
-                        self.finish_recording("processing completed")
-                    if cap is not None:
+                    if reader is not None:
+                        # The reader releases the capture once its current read returns
+                        stop_event.set()
+                        reader.join(timeout=self.INACTIVE_STREAM_TIMEOUT)
+                        if reader.is_alive():
+                            print("Reader still blocked on the stream; it will release the capture when the read returns")
+                    elif cap is not None:
                         cap.release()
-            
-            print(f"Waiting {self.RETRY_DELAY} seconds before processing next segment...")
-            time.sleep(self.RETRY_DELAY)
+
+                # The next window starts where this one ended
+                self.next_start_timestamp = end_time
+            else:
+                print(f"Waiting {self.RETRY_DELAY} seconds for new footage...")
+                time.sleep(self.RETRY_DELAY)
 
 def main():
+    processor = None
     try:
         processor = KinesisVideoProcessor()
         processor.process_archived_stream()
@@ -336,6 +602,11 @@ def main():
     except Exception as e:
         print(f"Fatal error: {str(e)}")
         raise
+    finally:
+        if processor is not None:
+            processor.finish_recording("shutdown")
+            # Let in-flight uploads complete before exiting
+            processor.upload_executor.shutdown(wait=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
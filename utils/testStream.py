@@ -1,44 +1,97 @@
 import os
 import sys
-import boto3
 import time
-import gi
 import subprocess
 import platform
+from functools import lru_cache
 from threading import Thread, Event
 import shutil
 import signal
 
-gi.require_version('Gst', '1.0')
-from gi.repository import Gst, GLib
+# Host invariants, resolved once at import
+SYSTEM = platform.system()
+# Common GStreamer plugin paths for this OS
+DEFAULT_PLUGIN_PATHS = {
+    'Linux': ('/usr/lib/gstreamer-1.0', '/usr/lib/x86_64-linux-gnu/gstreamer-1.0'),
+    'Darwin': ('/opt/homebrew/lib/gstreamer-1.0', '/usr/local/lib/gstreamer-1.0'),
+    'Windows': ('C:\\gstreamer\\1.0\\x86_64\\lib\\gstreamer-1.0',)
+}.get(SYSTEM, ())
+# Camera source element for this OS
+VIDEO_SOURCE = {
+    'Linux': 'v4l2src device=/dev/video0',
+    'Darwin': 'autovideosrc',  # macOS
+    'Windows': 'ksvideosrc'
+}.get(SYSTEM, 'autovideosrc')
+
+
+@lru_cache(maxsize=1)
+def load_gst():
+    """Import GStreamer bindings on first use, after the plugin environment has been configured"""
+    import gi
+    gi.require_version('Gst', '1.0')
+    from gi.repository import Gst, GLib
+    return Gst, GLib
+
+
+@lru_cache(maxsize=8)
+def build_pipeline(source_element, stream_name, region):
+    """Build the gst-launch style pipeline description, memoized per source, stream and region"""
+    # Each queue starts a new streaming thread. Raw frames may be dropped when the
+    # encoder falls behind; encoded frames are never dropped, since losing one would
+    # corrupt the rest of its GOP, so the second queue only applies backpressure.
+    return (
+        f"{source_element} ! "
+        f"videoconvert ! "
+        f"video/x-raw,format=I420 ! "
+        f"queue leaky=downstream max-size-buffers=2 max-size-bytes=0 max-size-time=0 ! "
+        f"x264enc tune=zerolatency speed-preset=ultrafast bframes=0 key-int-max=30 bitrate=500 ! "
+        f"video/x-h264,profile=baseline,stream-format=avc,alignment=au ! "
+        f"queue max-size-buffers=2 max-size-bytes=0 max-size-time=0 ! "
+        f"kvssink name=sink stream-name={stream_name} storage-size=64 "
+        f"aws-region={region}"
+    )
+
 
 class VideoStreamer:
     def __init__(self):
+        self.gst_features = {}  # GST_PLUGIN_PATH -> installed feature names
         self.get_user_preferences()
         self.setup_aws_credentials()
         self.check_gstreamer_setup()
         # Initialize GStreamer
+        Gst, _ = load_gst()
         Gst.init(None)
         self.setup_video_source()
         self.stop_event = Event()
+        self.pipeline_done = Event()  # set once the pipeline reports EOS or an error
         self.pipeline = None
         self.loop = None
-        self.gst_process = None
+        self.loop_thread = None
         
         # Setup signal handlers
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
         
-    def stop_streaming(self):
-        """Stop the streaming process"""
+    def stop_streaming(self, timeout=2):
+        """Stop the streaming pipeline, waiting at most timeout seconds in total"""
         try:
+            deadline = time.monotonic() + timeout
             self.stop_event.set()
-            if self.gst_process:
-                self.gst_process.terminate()
-                try:
-                    self.gst_process.wait(timeout=2)
-                except subprocess.TimeoutExpired:
-                    self.gst_process.kill()
+            if self.pipeline:
+                Gst, _ = load_gst()
+                # Send EOS so kvssink can flush buffered fragments before teardown
+                if not self.pipeline_done.is_set():
+                    self.pipeline.send_event(Gst.Event.new_eos())
+                    self.pipeline_done.wait(timeout=max(deadline - time.monotonic(), 0))
+                self.pipeline.set_state(Gst.State.NULL)
+                self.pipeline.get_bus().remove_signal_watch()
+                self.pipeline = None
+            if self.loop:
+                self.loop.quit()
+                self.loop = None
+            if self.loop_thread:
+                self.loop_thread.join(timeout=max(deadline - time.monotonic(), 0))
+                self.loop_thread = None
         except Exception as e:
             print(f"Error stopping stream: {e}")
 
@@ -52,29 +105,6 @@ class VideoStreamer:
         """Clean up all resources"""
         try:
             self.stop_streaming()
-            
-            # Kill any remaining gst-launch processes
-            try:
-                subprocess.run(['pkill', '-f', 'gst-launch-1.0'], 
-                             timeout=2,
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
-            except subprocess.TimeoutExpired:
-                pass
-            except Exception as e:
-                print(f"Error killing gst processes: {e}")
-                
-            # Kill specific pipeline process if it exists
-            if self.gst_process:
-                try:
-                    self.gst_process.terminate()
-                    self.gst_process.wait(timeout=2)
-                except:
-                    try:
-                        self.gst_process.kill()
-                    except:
-                        pass
-                        
             print("All resources cleaned up")
         except Exception as e:
             print(f"Error during cleanup: {e}")
@@ -82,19 +112,26 @@ class VideoStreamer:
     def check_gstreamer_setup(self):
         """Check and setup GStreamer environment"""
         print("\n=== GStreamer Configuration ===")
-        
-        # Check if gst-launch-1.0 is in PATH
-        if not shutil.which('gst-launch-1.0'):
-            print("GStreamer (gst-launch-1.0) not found in PATH.")
+
+        # Keep the plugin registry in a persistent cache and scan in-process, so the
+        # plugin scan is paid once and later runs (and gst-inspect-1.0) just load it
+        cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'video-monitor')
+        os.makedirs(cache_dir, exist_ok=True)
+        os.environ.setdefault('GST_REGISTRY', os.path.join(cache_dir, 'registry.bin'))
+        os.environ.setdefault('GST_REGISTRY_FORK', 'no')
+
+        # Check if gst-inspect-1.0 (used to verify plugins) is in PATH
+        if not shutil.which('gst-inspect-1.0'):
+            print("GStreamer (gst-inspect-1.0) not found in PATH.")
             while True:
                 gst_bin_path = input("Please enter the path to GStreamer binaries (e.g., /opt/homebrew/bin): ")
-                if os.path.exists(os.path.join(gst_bin_path, 'gst-launch-1.0')):
+                if os.path.exists(os.path.join(gst_bin_path, 'gst-inspect-1.0')):
                     # Add to PATH
                     os.environ['PATH'] = f"{gst_bin_path}:{os.environ.get('PATH', '')}"
                     print("GStreamer binaries path set successfully!")
                     break
                 else:
-                    print("Invalid path. gst-launch-1.0 not found in specified directory.")
+                    print("Invalid path. gst-inspect-1.0 not found in specified directory.")
         
         # Check existing GST_PLUGIN_PATH
         existing_path = os.environ.get('GST_PLUGIN_PATH')
@@ -103,20 +140,15 @@ class VideoStreamer:
             if self.check_gstreamer_requirements():
                 print("GStreamer plugin path verified successfully!")
                 return
-        # Common GStreamer plugin paths based on OS
-        default_paths = {
-            'Linux': ['/usr/lib/gstreamer-1.0', '/usr/lib/x86_64-linux-gnu/gstreamer-1.0'],
-            'Darwin': ['/opt/homebrew/lib/gstreamer-1.0', '/usr/local/lib/gstreamer-1.0'],
-            'Windows': ['C:\\gstreamer\\1.0\\x86_64\\lib\\gstreamer-1.0']
-        }
-        
-        system = platform.system()
-        for path in default_paths.get(system, []):
-            if os.path.exists(path):
-                os.environ['GST_PLUGIN_PATH'] = path
-                if self.check_gstreamer_requirements():
-                    print(f"Using default GStreamer plugin path: {path}")
-                    return
+        # Try every installed default path, most complete first, rather than stopping at the first one found.
+        # The file scan only orders the candidates; gst-inspect-1.0 decides whether one works.
+        candidates = [path for path in DEFAULT_PLUGIN_PATHS if os.path.isdir(path)]
+        candidates.sort(key=lambda path: self.count_plugin_files(path, ('kvssink', 'x264', 'videoconvert')), reverse=True)
+        for path in candidates:
+            os.environ['GST_PLUGIN_PATH'] = path
+            if self.check_gstreamer_requirements():
+                print(f"Using default GStreamer plugin path: {path}")
+                return
         
         # If no working paths found, ask user
         print("No valid GStreamer plugin path found.")
@@ -137,18 +169,27 @@ class VideoStreamer:
                 print("Cannot proceed without valid GStreamer setup.")
                 sys.exit(1)
 
+    def count_plugin_files(self, path, names):
+        """
+        Count how many of the named plugins have a plugin library in a directory.
+        Plugins are named libgst*.so/.dylib on Unix and gst*.dll (or libgst*.dll) on Windows.
+        """
+        try:
+            with os.scandir(path) as entries:
+                libraries = [entry.name for entry in entries
+                             if entry.name.removeprefix('lib').startswith('gst')
+                             and entry.name.endswith(('.so', '.dylib', '.dll'))]
+        except OSError:
+            return 0
+        return sum(any(name in library for library in libraries) for name in names)
+
     def check_gstreamer_requirements(self):
         """Check if GStreamer and required plugins are installed"""
         required_plugins = ['kvssink', 'x264enc', 'videoconvert']
-        missing_plugins = []
         
         try:
-            for plugin in required_plugins:
-                result = subprocess.run(['gst-inspect-1.0', plugin], 
-                                     stdout=subprocess.PIPE, 
-                                     stderr=subprocess.PIPE)
-                if result.returncode != 0:
-                    missing_plugins.append(plugin)
+            installed = self.get_gstreamer_features()
+            missing_plugins = [plugin for plugin in required_plugins if plugin not in installed]
                     
             if missing_plugins:
                 print(f"Missing GStreamer plugins: {', '.join(missing_plugins)}")
@@ -160,17 +201,62 @@ class VideoStreamer:
             print(f"Error checking GStreamer plugins: {str(e)}")
             return False
 
+    def get_gstreamer_features(self):
+        """List installed GStreamer features with a single gst-inspect-1.0 call, cached per plugin path"""
+        plugin_path = os.environ.get('GST_PLUGIN_PATH', '')
+        if plugin_path not in self.gst_features:
+            # Without arguments gst-inspect-1.0 prints one "plugin:  feature: description" line per feature
+            result = self.run_command(['gst-inspect-1.0'], timeout=30)
+            features = set()
+            for line in result.stdout.splitlines():
+                parts = line.split(':')
+                if len(parts) >= 3:
+                    features.add(parts[1].strip())
+            self.gst_features[plugin_path] = frozenset(features)
+        return self.gst_features[plugin_path]
+
+    def run_command(self, args, timeout=2):
+        """
+        Run a command to completion and capture its output, like subprocess.run(check=False).
+        The command runs in its own session so a timeout also kills anything it spawned
+        (e.g. gst-plugin-scanner), and communicate() always drains both pipes.
+        :param args: Command line as a list of arguments
+        :param timeout: Seconds to wait before killing the command and raising TimeoutExpired
+        :return: subprocess.CompletedProcess
+        """
+        process = subprocess.Popen(args,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE,
+                                   text=True,
+                                   start_new_session=True)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.kill_process_group(process)
+            process.communicate()
+            raise
+        return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+    def kill_process_group(self, process):
+        """Terminate a child started with start_new_session=True along with anything it spawned"""
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGTERM)
+            else:
+                process.terminate()
+            process.wait(timeout=0.5)
+        except ProcessLookupError:
+            pass
+        except subprocess.TimeoutExpired:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            process.wait()
+
     def setup_video_source(self):
         """Determine the appropriate video source based on the operating system"""
-        system = platform.system()
-        if system == 'Linux':
-            self.video_source = 'v4l2src device=/dev/video0'
-        elif system == 'Darwin':  # macOS
-            self.video_source = 'autovideosrc'
-        elif system == 'Windows':
-            self.video_source = 'ksvideosrc'
-        else:
-            self.video_source = 'autovideosrc'  # fallback
+        self.video_source = VIDEO_SOURCE
         print(f"Using video source: {self.video_source}")
 
     def get_user_preferences(self):
@@ -190,22 +276,24 @@ class VideoStreamer:
 
     def setup_aws_credentials(self):
         """Setup AWS credentials from AWS CLI configuration"""
+        import boto3
+        from botocore.config import Config
         try:
-            session = boto3.Session(region_name=self.region)
-            credentials = session.get_credentials()
+            # Create the session and KVS client once; short timeouts make a bad endpoint fail fast
+            self.session = boto3.Session(region_name=self.region)
+            self.kvs_client = self.session.client('kinesisvideo', config=Config(
+                connect_timeout=2,
+                read_timeout=5,
+                retries={'max_attempts': 3, 'mode': 'adaptive'}
+            ))
+            credentials = self.session.get_credentials()
             
             if not credentials:
                 print("Error: No AWS credentials found. Please configure AWS CLI.")
                 sys.exit(1)
-                
-            os.environ['AWS_ACCESS_KEY_ID'] = credentials.access_key
-            os.environ['AWS_SECRET_ACCESS_KEY'] = credentials.secret_key
-            
-            if credentials.token:
-                os.environ['AWS_SESSION_TOKEN'] = credentials.token
-                
-            os.environ['AWS_REGION'] = self.region
-            os.environ['KVS_STREAM_NAME'] = self.stream_name
+            # Kept on the instance and handed to kvssink only, instead of being exported
+            # to os.environ where every child process would inherit them
+            self.credentials = credentials.get_frozen_credentials()
             
             self.verify_kvs_stream()
             print("\nAWS Configuration verified successfully!")
@@ -217,73 +305,104 @@ class VideoStreamer:
     def verify_kvs_stream(self):
         """Verify KVS stream exists or create it"""
         try:
-            kvs_client = boto3.client('kinesisvideo', region_name=self.region)
             try:
-                kvs_client.describe_stream(StreamName=self.stream_name)
-            except kvs_client.exceptions.ResourceNotFoundException:
+                self.kvs_client.describe_stream(StreamName=self.stream_name)
+            except self.kvs_client.exceptions.ResourceNotFoundException:
                 print(f"Creating new KVS stream: {self.stream_name}")
-                kvs_client.create_stream(
+                self.kvs_client.create_stream(
                     StreamName=self.stream_name,
                     DataRetentionInHours=2,
                     MediaType='video/h264'
                 )
-                # Wait for stream to become active
-                waiter = kvs_client.get_waiter('stream_active')
-                waiter.wait(StreamName=self.stream_name)
+                self.wait_for_stream_active()
         except Exception as e:
             print(f"Error verifying KVS stream: {str(e)}")
             raise
 
+    def wait_for_stream_active(self, timeout=15):
+        """Poll until the KVS stream is ACTIVE, backing off from 0.2s to 2s between checks"""
+        delay = 0.2
+        deadline = time.monotonic() + timeout
+        while True:
+            response = self.kvs_client.describe_stream(StreamName=self.stream_name)
+            if response['StreamInfo']['Status'] == 'ACTIVE':
+                return
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"KVS stream {self.stream_name} not active after {timeout}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
     def create_pipeline(self, source_element):
         """Create GStreamer pipeline string"""
-        pipeline_str = (
-            f"{source_element} ! "
-            f"videoconvert ! "
-            f"x264enc bframes=0 key-int-max=45 bitrate=500 ! "
-            f"video/x-h264,profile=baseline,stream-format=avc,alignment=au ! "
-            f"kvssink stream-name={self.stream_name} storage-size=512 "
-            f"aws-region={self.region}"
-        )
-        return pipeline_str
-
-    def run_gstreamer_pipeline(self, pipeline_str):
-        """Run GStreamer pipeline using gst-launch"""
+        return build_pipeline(source_element, self.stream_name, self.region)
+
+    def kvssink_credentials(self):
+        """kvssink properties carrying the AWS credentials"""
+        properties = {
+            'access-key': self.credentials.access_key,
+            'secret-key': self.credentials.secret_key
+        }
+        if self.credentials.token:
+            properties['session-token'] = self.credentials.token
+        return properties
+
+    def run_gstreamer_pipeline(self, pipeline_str, element_properties=None):
+        """
+        Run GStreamer pipeline in-process.
+        :param pipeline_str: Pipeline description in gst-launch syntax
+        :param element_properties: Optional {element name: {property: value}} applied after parsing,
+            so values such as file paths never need quoting inside the description
+        """
+        Gst, GLib = load_gst()
         try:
-            # Kill any existing gst-launch processes
-            try:
-                subprocess.run(['pkill', '-f', 'gst-launch-1.0'], 
-                            timeout=2,
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE)
-            except:
-                pass
-
-            # Start new pipeline process
-            self.gst_process = subprocess.Popen(
-                ['gst-launch-1.0', '-v'] + pipeline_str.split(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+            self.pipeline_done.clear()
+            self.pipeline = Gst.parse_launch(pipeline_str)
+            element_properties = {'sink': self.kvssink_credentials(), **(element_properties or {})}
+            for name, properties in element_properties.items():
+                element = self.pipeline.get_by_name(name)
+                for prop, value in properties.items():
+                    element.set_property(prop, value)
+
+            # Watch the bus from a GLib main loop running on a worker thread
+            bus = self.pipeline.get_bus()
+            bus.add_signal_watch()
+            bus.connect('message::error', self.on_pipeline_error)
+            bus.connect('message::eos', self.on_pipeline_eos)
+            self.loop = GLib.MainLoop()
+            self.loop_thread = Thread(target=self.loop.run, daemon=True)
+            self.loop_thread.start()
+
+            if self.pipeline.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+                print("Pipeline error: unable to start the pipeline")
+                self.pipeline_done.set()
+                return
             
             print("\nStreaming started... Press Ctrl+C to stop")
             
-            while not self.stop_event.is_set():
-                return_code = self.gst_process.poll()
-                if return_code is not None:
-                    # Pipeline has finished or encountered an error
-                    error = self.gst_process.stderr.read().decode()
-                    if error and return_code != 0:
-                        print(f"Pipeline error: {error}")
-                    elif return_code == 0:
-                        print("\nStream completed successfully")
-                    break
-                time.sleep(0.1)
+            # Block until the pipeline finishes or streaming is stopped
+            self.stop_event.wait()
                     
         except KeyboardInterrupt:
             print("\nStreaming interrupted by user")
         finally:
             self.cleanup_resources()
 
+    def on_pipeline_error(self, bus, message):
+        """Report a pipeline error and stop streaming"""
+        error, debug = message.parse_error()
+        print(f"Pipeline error: {error.message}")
+        if debug:
+            print(debug)
+        self.pipeline_done.set()
+        self.stop_event.set()
+
+    def on_pipeline_eos(self, bus, message):
+        """Handle end of stream"""
+        if not self.stop_event.is_set():
+            print("\nStream completed successfully")
+        self.pipeline_done.set()
+        self.stop_event.set()
+
 
     def stream_from_webcam(self):
         """Stream from webcam source"""
@@ -302,10 +421,10 @@ class VideoStreamer:
             file_path = input("\nEnter the path to your video file: ")
             if os.path.exists(file_path):
                 try:
-                    source_element = f'filesrc location="{file_path}" ! decodebin'
+                    source_element = 'filesrc name=source ! decodebin'
                     pipeline_str = self.create_pipeline(source_element)
                     self.stop_event.clear()
-                    self.run_gstreamer_pipeline(pipeline_str)
+                    self.run_gstreamer_pipeline(pipeline_str, {'source': {'location': file_path}})
                     print("\nStreaming session ended")
                     break
                 except Exception as e:
@@ -326,7 +445,9 @@ def main():
     print("\nWelcome to KVS Video Streaming Application!")
     
     try:
-        streamer = VideoStreamer()
+        # AWS and GStreamer are set up on the first streaming choice, so quitting
+        # straight away never imports boto3 or the GStreamer bindings
+        streamer = None
         
         while True:
             print("\n=== Video Streaming Application ===")
@@ -337,6 +458,9 @@ def main():
             
             choice = input("\nEnter your choice (1-3): ")
             
+            if choice in ('1', '2') and streamer is None:
+                streamer = VideoStreamer()
+            
             if choice == '1':
                 streamer.stream_from_webcam()
             elif choice == '2':
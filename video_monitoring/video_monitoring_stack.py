@@ -5,7 +5,9 @@ from aws_cdk import (
     aws_ec2 as ec2,
     aws_iam as iam,
     aws_lambda as lambda_,
+    aws_lambda_event_sources as lambda_event_sources,
     aws_sns as sns,
+    aws_sqs as sqs,
     aws_kms as kms,
     aws_ecr as ecr,
     aws_kinesisvideo as kvs,
@@ -13,6 +15,7 @@ from aws_cdk import (
     aws_logs as logs,
     RemovalPolicy,
     Duration,
+    Size,
     CfnOutput
 )
 from constructs import Construct
@@ -29,17 +32,18 @@ class VideoMonitoringStack(Stack):
             removal_policy=RemovalPolicy.DESTROY
         )
         
-        # Create VPC with proper configuration for Lambda
+        # Create VPC with proper configuration for Lambda. The Lambda reaches every
+        # service it calls through VPC endpoints, so no NAT gateway is needed
         vpc = ec2.Vpc(
             self, "VideoProcessingVPC",
             max_azs=2,
-            nat_gateways=1,
+            nat_gateways=0,
             enable_dns_hostnames=True,
             enable_dns_support=True,
             subnet_configuration=[
                 ec2.SubnetConfiguration(
                     name="Private",
-                    subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS,
+                    subnet_type=ec2.SubnetType.PRIVATE_ISOLATED,
                     cidr_mask=24
                 ),
                 ec2.SubnetConfiguration(
@@ -92,6 +96,11 @@ class VideoMonitoringStack(Stack):
             service=ec2.InterfaceVpcEndpointAwsService.SNS
         )
 
+        vpc.add_interface_endpoint(
+            "BedrockEndpoint",
+            service=ec2.InterfaceVpcEndpointAwsService.BEDROCK_RUNTIME
+        )
+
         # Create KMS keys
         bucket_key = kms.Key(
             self, "BucketEncryptionKey",
@@ -123,10 +132,13 @@ class VideoMonitoringStack(Stack):
             block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
             removal_policy=RemovalPolicy.DESTROY,
             auto_delete_objects=True,
-            versioned=True,
+            # Objects are write-once snippets that expire after 7 days, so versioning
+            # only adds noncurrent versions for the lifecycle scan to track
+            versioned=False,
             lifecycle_rules=[
                 s3.LifecycleRule(
-                    expiration=Duration.days(7)
+                    expiration=Duration.days(7),
+                    abort_incomplete_multipart_upload_after=Duration.days(1)
                 )
             ],
             server_access_logs_prefix="access-logs/",
@@ -156,136 +168,124 @@ class VideoMonitoringStack(Stack):
             master_key=sns_encryption_key
         )
 
-        # Create Lambda role with VPC permissions
-        lambda_role = iam.Role(
-            self, "LambdaRole",
-            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com")
-        )
-
-        # Add custom CloudWatch Logs permissions 
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "logs:CreateLogGroup",
-                    "logs:CreateLogStream",
-                    "logs:PutLogEvents"
-                ],
-                resources=[
-                    f"arn:{self.partition}:logs:{self.region}:{self.account}:log-group:/aws/lambda/*"
-                ]
-            )
+        # Create SQS queue that buffers upload notifications so the Lambda
+        # processes videos in batches, with a dead-letter queue for failures
+        video_dlq = sqs.Queue(
+            self, "VideoAnalysisDLQ",
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            enforce_ssl=True,
+            retention_period=Duration.days(14)
         )
 
-        # Add VPC permissions 
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "ec2:CreateNetworkInterface",
-                    "ec2:DescribeNetworkInterfaces",
-                    "ec2:DeleteNetworkInterface",
-                ],
-                resources=[
-                    f"arn:{self.partition}:ec2:{self.region}:{self.account}:*/*"
-                ],
-                conditions={
-                    "StringEquals": {
-                        "ec2:vpc": vpc.vpc_id
-                    }
-                }
+        video_queue = sqs.Queue(
+            self, "VideoAnalysisQueue",
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            enforce_ssl=True,
+            visibility_timeout=Duration.minutes(30),
+            dead_letter_queue=sqs.DeadLetterQueue(
+                max_receive_count=3,
+                queue=video_dlq
             )
         )
 
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "ec2:AssignPrivateIpAddresses",
-                    "ec2:UnassignPrivateIpAddresses"
-                ],
-                resources=[
-                    f"arn:{self.partition}:ec2:{self.region}:{self.account}:network-interface/*"
-                ],
-                conditions={
-                    "StringEquals": {
-                        "ec2:vpc": vpc.vpc_id
+        # Create Lambda role with VPC permissions, granted through a single inline policy
+        lambda_policy = iam.PolicyDocument(
+            statements=[
+                # Add custom CloudWatch Logs permissions
+                iam.PolicyStatement(
+                    actions=[
+                        "logs:CreateLogGroup",
+                        "logs:CreateLogStream",
+                        "logs:PutLogEvents"
+                    ],
+                    resources=[
+                        f"arn:{self.partition}:logs:{self.region}:{self.account}:log-group:/aws/lambda/*"
+                    ]
+                ),
+                # Add VPC permissions
+                iam.PolicyStatement(
+                    actions=[
+                        "ec2:CreateNetworkInterface",
+                        "ec2:DescribeNetworkInterfaces",
+                        "ec2:DeleteNetworkInterface",
+                        "ec2:AssignPrivateIpAddresses",
+                        "ec2:UnassignPrivateIpAddresses"
+                    ],
+                    resources=[
+                        f"arn:{self.partition}:ec2:{self.region}:{self.account}:*/*"
+                    ],
+                    conditions={
+                        "StringEquals": {
+                            "ec2:vpc": vpc.vpc_id
+                        }
                     }
-                }
-            )
-        )
-
-        # Add Bedrock permission
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=["bedrock:InvokeModel"],
-                resources=[
-                    f"arn:{self.partition}:bedrock:{self.region}::foundation-model/amazon.nova-lite-v1:0"
-                ]
-            )
+                ),
+                # Add Bedrock permission
+                iam.PolicyStatement(
+                    actions=["bedrock:InvokeModel"],
+                    resources=[
+                        f"arn:{self.partition}:bedrock:{self.region}::foundation-model/amazon.nova-lite-v1:0"
+                    ]
+                ),
+                # Grant specific KMS permissions instead of using grant methods which create wildcards
+                iam.PolicyStatement(
+                    actions=[
+                        "kms:Decrypt",
+                    ],
+                    resources=[
+                        bucket_key.key_arn
+                    ]
+                ),
+                iam.PolicyStatement(
+                    actions=[
+                        "kms:Encrypt",
+                        "kms:Decrypt",
+                        "kms:GenerateDataKey",
+                        "kms:ReEncrypt",
+                        "kms:ReEncryptFrom",
+                        "kms:ReEncryptTo"
+                    ],
+                    resources=[
+                        sns_encryption_key.key_arn
+                    ]
+                ),
+                # Grant specific SNS permissions
+                iam.PolicyStatement(
+                    actions=[
+                        "sns:Publish"
+                    ],
+                    resources=[
+                        alert_topic.topic_arn
+                    ]
+                ),
+                # Grant specific S3 bucket and object permissions
+                iam.PolicyStatement(
+                    actions=[
+                        "s3:GetBucketLocation",
+                        "s3:GetBucketVersioning",
+                        "s3:ListBucket"
+                    ],
+                    resources=[
+                        video_bucket.bucket_arn
+                    ]
+                ),
+                iam.PolicyStatement(
+                    actions=[
+                        "s3:GetObject"
+                    ],
+                    resources=[
+                        f"{video_bucket.bucket_arn}/*"
+                    ]
+                )
+            ]
         )
 
-        # Grant specific KMS permissions instead of using grant methods which create wildcards
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "kms:Decrypt",
-                ],
-                resources=[
-                    bucket_key.key_arn
-                ]
-            )
-        )
-        
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "kms:Encrypt",
-                    "kms:Decrypt",
-                    "kms:GenerateDataKey",
-                    "kms:ReEncrypt",
-                    "kms:ReEncryptFrom",
-                    "kms:ReEncryptTo"
-                ],
-                resources=[
-                    sns_encryption_key.key_arn
-                ]
-            )
-        )
-        
-        # Grant specific SNS permissions
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "sns:Publish"
-                ],
-                resources=[
-                    alert_topic.topic_arn
-                ]
-            )
-        )
-        
-        # Grant specific S3 bucket and object permissions
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "s3:GetBucketLocation",
-                    "s3:GetBucketVersioning",
-                    "s3:ListBucket"
-                ],
-                resources=[
-                    video_bucket.bucket_arn
-                ]
-            )
-        )
-        
-        lambda_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=[
-                    "s3:GetObject",
-                    "s3:GetObjectVersion"
-                ],
-                resources=[
-                    f"{video_bucket.bucket_arn}/*"
-                ]
-            )
+        lambda_role = iam.Role(
+            self, "LambdaRole",
+            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
+            inline_policies={
+                "LambdaPolicy": lambda_policy
+            }
         )
 
         # Create security group for Lambda
@@ -300,6 +300,9 @@ class VideoMonitoringStack(Stack):
         threat_detection_lambda = lambda_.Function(
             self, "ThreatDetectionFunction",
             runtime=lambda_.Runtime.PYTHON_3_13,  # Updated to latest runtime
+            architecture=lambda_.Architecture.ARM_64,
+            memory_size=1024,  # CPU scales with memory, speeding up cold starts
+            ephemeral_storage_size=Size.mebibytes(512),
             handler="lambda_function.lambda_handler",
             code=lambda_.Code.from_asset("lambda"),
             role=lambda_role,
@@ -312,7 +315,7 @@ class VideoMonitoringStack(Stack):
             },
             vpc=vpc,
             vpc_subnets=ec2.SubnetSelection(
-                subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS
+                subnet_type=ec2.SubnetType.PRIVATE_ISOLATED
             ),
             security_groups=[lambda_security_group]
         )
@@ -320,7 +323,26 @@ class VideoMonitoringStack(Stack):
         # Add S3 event notification
         video_bucket.add_event_notification(
             s3.EventType.OBJECT_CREATED,
-            s3n.LambdaDestination(threat_detection_lambda),
+            s3n.SqsDestination(video_queue),
+        )
+
+        # Keep one execution environment warm behind an alias so analysis
+        # requests do not pay the cold start
+        live_alias = lambda_.Alias(
+            self, "LiveAlias",
+            alias_name="live",
+            version=threat_detection_lambda.current_version,
+            provisioned_concurrent_executions=1
+        )
+
+        # Drain the queue in batches of up to 5 videos
+        live_alias.add_event_source(
+            lambda_event_sources.SqsEventSource(
+                video_queue,
+                batch_size=5,
+                max_batching_window=Duration.seconds(30),
+                report_batch_item_failures=True
+            )
         )
 
         # Outputs
@@ -336,6 +358,10 @@ class VideoMonitoringStack(Stack):
                  value=ecr_repo.repository_uri,
                  description="URI of the ECR repository for the container image")
         
+        CfnOutput(self, "VideoAnalysisQueueUrl", 
+                 value=video_queue.queue_url,
+                 description="URL of the SQS queue feeding video analysis")
+        
         CfnOutput(self, "SNSTopicArn", 
                  value=alert_topic.topic_arn,
                  description="ARN of the SNS topic for threat alerts")